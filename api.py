@@ -4,16 +4,25 @@ Integração entre Dashboard e OpenClaw
 """
 
 import asyncio
+import itertools
 import logging
+import time
+from collections import deque
 from contextlib import asynccontextmanager
-from datetime import datetime
-from typing import List, Optional
+from typing import Deque, List, Optional, Set, Type, TypeVar
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, WebSocket, WebSocketDisconnect
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-
-from openclaw_client import OpenClawClient, get_openclaw_client
+from fastapi.responses import ORJSONResponse
+import orjson
+from pydantic import BaseModel, Field, ValidationError
+
+import cache
+import clock
+from schemas import READ_ONLY_MODEL_CONFIG
+from ids import timestamp_prefix
+from openclaw_client import OpenClawClient, get_openclaw_client, install_uvloop
 from workflows import (
     WorkflowManager, 
     get_workflow_manager,
@@ -34,18 +43,38 @@ ALLOWED_ORIGINS = [
     "http://127.0.0.1:8000",
     "http://localhost:3000",
     "http://localhost:8080",
-    "https://*.github.io",
-    "*"  # Permite todas as origens em desenvolvimento
 ]
+# Dashboards publicados no GitHub Pages
+ALLOWED_ORIGIN_REGEX = r"https://[\w-]+\.github\.io"
+ALLOWED_METHODS = ["GET", "POST", "DELETE"]
+
+# TTLs do cache (segundos); só endpoints que consultam o OpenClaw são
+# cacheados, workflows e estatísticas são lidos direto da memória
+CACHE_TTL_SESSIONS = 15
+CACHE_TTL_SUBAGENTS = 15
+
+# Intervalo de publicação de estatísticas via WebSocket (segundos)
+STATS_BROADCAST_INTERVAL = 3
+# Tempo máximo para enviar a um cliente antes de descartá-lo (segundos)
+WS_SEND_TIMEOUT = 1.0
+# Clientes atendidos por vez em um broadcast antes de devolver o loop
+WS_BROADCAST_BATCH = 50
+
+# Quantidade máxima de logs mantidos em memória
+MAX_SYSTEM_LOGS = 10_000
 
 # Modelos Pydantic
 class StatusResponse(BaseModel):
+    model_config = READ_ONLY_MODEL_CONFIG
+    
     status: str
     openclaw_connected: bool
     timestamp: str
     version: str = "1.0.0"
 
 class Session(BaseModel):
+    model_config = READ_ONLY_MODEL_CONFIG
+    
     id: str
     type: str
     status: str
@@ -58,6 +87,8 @@ class SubagentCreate(BaseModel):
     model: Optional[str] = Field(None, description="Modelo a ser usado")
 
 class Subagent(BaseModel):
+    model_config = READ_ONLY_MODEL_CONFIG
+    
     id: str
     status: str
     task: str
@@ -73,6 +104,8 @@ class WorkflowCreate(BaseModel):
     auto_start: bool = False
 
 class WorkflowStepResponse(BaseModel):
+    model_config = READ_ONLY_MODEL_CONFIG
+    
     id: str
     name: str
     description: str
@@ -85,6 +118,8 @@ class WorkflowStepResponse(BaseModel):
     error: Optional[str] = None
 
 class WorkflowResponse(BaseModel):
+    model_config = READ_ONLY_MODEL_CONFIG
+    
     id: str
     name: str
     description: str
@@ -100,12 +135,16 @@ class WorkflowResponse(BaseModel):
     logs: List[dict]
 
 class LogEntry(BaseModel):
+    model_config = READ_ONLY_MODEL_CONFIG
+    
     time: str
     level: str
     message: str
     source: Optional[str] = None
 
 class SystemStats(BaseModel):
+    model_config = READ_ONLY_MODEL_CONFIG
+    
     workflows_total: int
     workflows_running: int
     workflows_completed: int
@@ -117,7 +156,47 @@ class SystemStats(BaseModel):
 # Gerenciadores globais
 openclaw_client: Optional[OpenClawClient] = None
 workflow_manager: Optional[WorkflowManager] = None
-system_logs: List[dict] = []
+system_logs: Deque[dict] = deque(maxlen=MAX_SYSTEM_LOGS)
+active_ws: Set[WebSocket] = set()
+# Fechamentos em andamento de clientes descartados (mantém referência às tasks)
+_closing_ws: Set[asyncio.Task] = set()
+
+# Dados simulados (modo sem OpenClaw), montados uma vez e renovados periodicamente
+SIMULATED_REFRESH_INTERVAL = 60
+_SIMULATED_SESSIONS: List[Session] = []
+_SIMULATED_SUBAGENTS: List[Subagent] = []
+
+def _build_simulated_data():
+    """Monta as listas simuladas de sessões e subagentes"""
+    global _SIMULATED_SESSIONS, _SIMULATED_SUBAGENTS
+    _SIMULATED_SESSIONS = [
+        Session.model_construct(
+            id="session-001",
+            type="main",
+            status="active",
+            created_at=clock.now_iso,
+            metadata={"channel": "telegram"}
+        ),
+        Session.model_construct(
+            id="session-002",
+            type="subagent",
+            status="active",
+            created_at=clock.now_iso,
+            metadata={"parent": "session-001"}
+        )
+    ]
+    _SIMULATED_SUBAGENTS = [
+        Subagent.model_construct(
+            id="subagent-001",
+            status="running",
+            task="Análise de código",
+            label="Revisor",
+            created_at=clock.now_iso,
+            model="default"
+        )
+    ]
+
+clock.every(SIMULATED_REFRESH_INTERVAL, _build_simulated_data)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -126,17 +205,24 @@ async def lifespan(app: FastAPI):
     
     logger.info("🚀 Iniciando Mission Control API...")
     
+    clock.tick()
+    clock_task = asyncio.create_task(clock.run())
+    
     # Inicializa gerenciador de workflows
     workflow_manager = get_workflow_manager()
     
+    # Publicador único de estatísticas para os clientes WebSocket
+    stats_task = asyncio.create_task(broadcast_stats())
+    
     # Tenta conectar ao OpenClaw (não bloqueia se falhar)
     try:
-        openclaw_client = OpenClawClient()
-        connected = await asyncio.wait_for(openclaw_client.connect(), timeout=5.0)
+        # Uma única conexão compartilhada por todas as requisições
+        openclaw_client = await asyncio.wait_for(get_openclaw_client(), timeout=5.0)
+        connected = openclaw_client.connected
         if connected:
             logger.info("✅ Conectado ao OpenClaw!")
             system_logs.append({
-                "time": datetime.now().strftime("%H:%M:%S"),
+                "time": clock.now_hms,
                 "level": "success",
                 "message": "Conectado ao OpenClaw",
                 "source": "system"
@@ -147,7 +233,7 @@ async def lifespan(app: FastAPI):
         logger.warning(f"⚠️ OpenClaw não disponível: {e}")
         logger.info("API funcionará em modo simulado")
         system_logs.append({
-            "time": datetime.now().strftime("%H:%M:%S"),
+            "time": clock.now_hms,
             "level": "warning",
             "message": f"OpenClaw não disponível: {e}",
             "source": "system"
@@ -157,6 +243,8 @@ async def lifespan(app: FastAPI):
     
     # Cleanup
     logger.info("🛑 Encerrando Mission Control API...")
+    stats_task.cancel()
+    clock_task.cancel()
     if openclaw_client:
         await openclaw_client.disconnect()
 
@@ -165,18 +253,49 @@ app = FastAPI(
     title="Mission Control API",
     description="API de integração entre Dashboard e OpenClaw",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Configura CORS
 app.add_middleware(
     CORSMiddleware,
     allow_origins=ALLOWED_ORIGINS,
+    allow_origin_regex=ALLOWED_ORIGIN_REGEX,
     allow_credentials=True,
-    allow_methods=["*"],
+    allow_methods=ALLOWED_METHODS,
     allow_headers=["*"],
 )
 
+# ============== CORPO DAS REQUISIÇÕES ==============
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+async def parse_body(request: Request, model: Type[ModelT]) -> ModelT:
+    """Valida o corpo JSON direto dos bytes, sem convertê-lo para dict antes"""
+    try:
+        return model.model_validate_json(await request.body())
+    except ValidationError as e:
+        raise RequestValidationError([
+            {**err, "loc": ("body", *err["loc"])}
+            for err in e.errors(include_url=False)
+        ])
+
+def json_body_schema(model: Type[BaseModel]) -> dict:
+    """Documenta no OpenAPI o corpo lido manualmente via parse_body"""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": model.model_json_schema()}}
+        }
+    }
+
+# ============== CACHE ==============
+
+async def invalidate_subagents():
+    """Invalida caches que dependem da lista de subagentes"""
+    await cache.invalidate("subagents")
+
 # ============== ENDPOINTS ==============
 
 @app.get("/")
@@ -197,10 +316,10 @@ async def get_status():
     return StatusResponse(
         status="healthy" if connected else "degraded",
         openclaw_connected=connected,
-        timestamp=datetime.now().isoformat()
+        timestamp=clock.now_iso
     )
 
-@app.get("/api/stats", response_model=SystemStats)
+@app.get("/api/stats", responses={200: {"model": SystemStats}})
 async def get_stats():
     """Retorna estatísticas do sistema"""
     wf_stats = workflow_manager.get_stats() if workflow_manager else {}
@@ -219,36 +338,23 @@ async def get_stats():
         workflows_failed=wf_stats.get("failed", 0),
         subagents_active=subagents_count,
         sessions_active=sessions_count,
-        timestamp=datetime.now().isoformat()
-    )
+        timestamp=clock.now_iso
+    ).model_dump(mode="json")
 
 # ============== SESSIONS ==============
 
-@app.get("/api/sessions", response_model=List[Session])
+@app.get("/api/sessions", responses={200: {"model": List[Session]}})
+@cache.cached("sessions", ttl=CACHE_TTL_SESSIONS)
 async def list_sessions():
     """Lista sessões ativas do OpenClaw"""
     if not openclaw_client or not openclaw_client.connected:
         # Retorna dados simulados para testes
-        return [
-            Session(
-                id="session-001",
-                type="main",
-                status="active",
-                created_at=datetime.now().isoformat(),
-                metadata={"channel": "telegram"}
-            ),
-            Session(
-                id="session-002",
-                type="subagent",
-                status="active",
-                created_at=datetime.now().isoformat(),
-                metadata={"parent": "session-001"}
-            )
-        ]
+        return _SIMULATED_SESSIONS
     
+    # Dados do gateway são confiáveis: monta os modelos sem revalidar
     sessions = await openclaw_client.get_sessions()
     return [
-        Session(
+        Session.model_construct(
             id=s.get("id", "unknown"),
             type=s.get("type", "unknown"),
             status=s.get("status", "unknown"),
@@ -264,7 +370,7 @@ async def get_session(session_id: str):
     if openclaw_client and openclaw_client.connected:
         session = await openclaw_client.get_session(session_id)
         if session:
-            return Session(
+            return Session.model_construct(
                 id=session.get("id", session_id),
                 type=session.get("type", "unknown"),
                 status=session.get("status", "unknown"),
@@ -276,38 +382,31 @@ async def get_session(session_id: str):
 
 # ============== SUBAGENTS ==============
 
-@app.get("/api/subagents", response_model=List[Subagent])
+@app.get("/api/subagents", responses={200: {"model": List[Subagent]}})
+@cache.cached("subagents", ttl=CACHE_TTL_SUBAGENTS)
 async def list_subagents():
     """Lista subagentes ativos"""
     if not openclaw_client or not openclaw_client.connected:
         # Dados simulados
-        return [
-            Subagent(
-                id="subagent-001",
-                status="running",
-                task="Análise de código",
-                label="Revisor",
-                created_at=datetime.now().isoformat(),
-                model="default"
-            )
-        ]
+        return _SIMULATED_SUBAGENTS
     
     subagents = await openclaw_client.get_subagents()
     return [
-        Subagent(
+        Subagent.model_construct(
             id=s.get("id", "unknown"),
             status=s.get("status", "unknown"),
             task=s.get("task", ""),
             label=s.get("label"),
-            created_at=s.get("created_at", datetime.now().isoformat()),
+            created_at=s.get("created_at", clock.now_iso),
             model=s.get("model")
         )
         for s in subagents
     ]
 
-@app.post("/api/subagents", response_model=Subagent)
-async def create_subagent(data: SubagentCreate):
+@app.post("/api/subagents", response_model=Subagent, openapi_extra=json_body_schema(SubagentCreate))
+async def create_subagent(request: Request):
     """Cria um novo subagente"""
+    data = await parse_body(request, SubagentCreate)
     logger.info(f"Criando subagente: {data.label or 'unnamed'}")
     
     if openclaw_client and openclaw_client.connected:
@@ -317,9 +416,10 @@ async def create_subagent(data: SubagentCreate):
                 label=data.label,
                 model=data.model
             )
+            await invalidate_subagents()
             
             system_logs.append({
-                "time": datetime.now().strftime("%H:%M:%S"),
+                "time": clock.now_hms,
                 "level": "info",
                 "message": f"Subagente criado: {result.get('id')}",
                 "source": "api"
@@ -330,7 +430,7 @@ async def create_subagent(data: SubagentCreate):
                 status="spawning",
                 task=data.task,
                 label=data.label,
-                created_at=datetime.now().isoformat(),
+                created_at=clock.now_iso,
                 model=data.model
             )
         except Exception as e:
@@ -338,13 +438,13 @@ async def create_subagent(data: SubagentCreate):
             raise HTTPException(status_code=500, detail=str(e))
     else:
         # Modo simulado
-        subagent_id = f"subagent-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        subagent_id = f"subagent-{timestamp_prefix()}"
         return Subagent(
             id=subagent_id,
             status="simulated",
             task=data.task,
             label=data.label,
-            created_at=datetime.now().isoformat(),
+            created_at=clock.now_iso,
             model=data.model
         )
 
@@ -357,8 +457,9 @@ async def stop_subagent(subagent_id: str):
         try:
             success = await openclaw_client.stop_subagent(subagent_id)
             if success:
+                await invalidate_subagents()
                 system_logs.append({
-                    "time": datetime.now().strftime("%H:%M:%S"),
+                    "time": clock.now_hms,
                     "level": "info",
                     "message": f"Subagente parado: {subagent_id}",
                     "source": "api"
@@ -371,7 +472,7 @@ async def stop_subagent(subagent_id: str):
 
 # ============== WORKFLOWS ==============
 
-@app.get("/api/workflows", response_model=List[WorkflowResponse])
+@app.get("/api/workflows", responses={200: {"model": List[WorkflowResponse]}})
 async def list_workflows(
     status: Optional[str] = None,
     limit: int = 50
@@ -402,12 +503,13 @@ async def get_workflow(workflow_id: str):
     
     return workflow.to_dict()
 
-@app.post("/api/workflows", response_model=WorkflowResponse)
+@app.post("/api/workflows", response_model=WorkflowResponse, openapi_extra=json_body_schema(WorkflowCreate))
 async def create_workflow(
-    data: WorkflowCreate,
+    request: Request,
     background_tasks: BackgroundTasks
 ):
     """Cria um novo workflow"""
+    data = await parse_body(request, WorkflowCreate)
     if not workflow_manager:
         raise HTTPException(status_code=503, detail="Workflow manager não disponível")
     
@@ -422,7 +524,7 @@ async def create_workflow(
     )
     
     system_logs.append({
-        "time": datetime.now().strftime("%H:%M:%S"),
+        "time": clock.now_hms,
         "level": "info",
         "message": f"Workflow criado: {workflow.name}",
         "source": "api"
@@ -478,21 +580,24 @@ async def list_templates():
 
 # ============== LOGS ==============
 
-@app.get("/api/logs", response_model=List[LogEntry])
+@app.get("/api/logs", responses={200: {"model": List[LogEntry]}})
 async def get_logs(limit: int = 100, source: Optional[str] = None):
     """Retorna logs do sistema"""
-    logs = system_logs[-limit:] if system_logs else []
+    # Últimos `limit` logs, em ordem cronológica
+    logs = list(itertools.islice(reversed(system_logs), max(limit, 0)))
+    logs.reverse()
     
     if source:
         logs = [l for l in logs if l.get("source") == source]
     
-    return [LogEntry(**l) for l in logs]
+    return logs
 
-@app.post("/api/logs")
-async def add_log(entry: LogEntry):
+@app.post("/api/logs", openapi_extra=json_body_schema(LogEntry))
+async def add_log(request: Request):
     """Adiciona uma entrada de log (para testes)"""
+    entry = await parse_body(request, LogEntry)
     system_logs.append({
-        "time": entry.time or datetime.now().strftime("%H:%M:%S"),
+        "time": entry.time or clock.now_hms,
         "level": entry.level,
         "message": entry.message,
         "source": entry.source or "external"
@@ -501,7 +606,67 @@ async def add_log(entry: LogEntry):
 
 # ============== WEBSOCKET (opcional) ==============
 
-from fastapi import WebSocket, WebSocketDisconnect
+# Último payload stats_update serializado e quando foi gerado
+_stats_payload: str = ""
+_stats_payload_ts: float = float("-inf")
+
+async def stats_payload() -> str:
+    """Payload stats_update serializado, reaproveitado durante um ciclo"""
+    global _stats_payload, _stats_payload_ts
+    now = time.monotonic()
+    if now - _stats_payload_ts >= STATS_BROADCAST_INTERVAL:
+        stats = await get_stats()
+        _stats_payload = orjson.dumps({"type": "stats_update", "data": stats}).decode()
+        _stats_payload_ts = now
+    return _stats_payload
+
+def workflows_payload(snapshot: bytes) -> str:
+    """Monta a mensagem workflows_update a partir do snapshot já serializado"""
+    return (b'{"type":"workflows_update","data":' + snapshot + b"}").decode()
+
+async def broadcast(payload: str):
+    """Envia um payload já serializado a todos os clientes WebSocket"""
+    clients = list(active_ws)
+    for i in range(0, len(clients), WS_BROADCAST_BATCH):
+        batch = clients[i:i + WS_BROADCAST_BATCH]
+        results = await asyncio.gather(
+            *(asyncio.wait_for(ws.send_text(payload), WS_SEND_TIMEOUT) for ws in batch),
+            return_exceptions=True
+        )
+        # Clientes lentos ou desconectados deixam de receber broadcasts e têm
+        # a conexão fechada, para que o dashboard perceba e reconecte
+        for ws, result in zip(batch, results):
+            if isinstance(result, Exception):
+                active_ws.discard(ws)
+                task = asyncio.create_task(close_ws(ws))
+                _closing_ws.add(task)
+                task.add_done_callback(_closing_ws.discard)
+        await asyncio.sleep(0)
+
+async def close_ws(ws: WebSocket):
+    """Fecha a conexão de um cliente descartado (1011: erro no servidor)"""
+    try:
+        await asyncio.wait_for(ws.close(code=1011), WS_SEND_TIMEOUT)
+    except Exception:
+        pass
+
+async def broadcast_stats():
+    """Publica estatísticas (e workflows, quando mudam) uma vez por ciclo"""
+    last_snapshot = None
+    while True:
+        if active_ws:
+            try:
+                await broadcast(await stats_payload())
+                
+                if workflow_manager:
+                    snapshot = workflow_manager.snapshot_bytes()
+                    if snapshot is not last_snapshot:
+                        await broadcast(workflows_payload(snapshot))
+                        last_snapshot = snapshot
+            except Exception as e:
+                logger.error(f"Erro publicando estatísticas: {e}")
+        
+        await asyncio.sleep(STATS_BROADCAST_INTERVAL)
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
@@ -509,21 +674,26 @@ async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
     
     try:
+        # Envia o estado atual imediatamente; as atualizações seguintes
+        # chegam pelo publicador em broadcast_stats
+        await websocket.send_text(await stats_payload())
+        if workflow_manager:
+            await websocket.send_text(workflows_payload(workflow_manager.snapshot_bytes()))
+        active_ws.add(websocket)
+        
+        # Mantém a conexão aberta até o cliente desconectar
         while True:
-            # Envia atualizações periódicas
-            stats = await get_stats()
-            await websocket.send_json({
-                "type": "stats_update",
-                "data": stats.dict()
-            })
-            
-            await asyncio.sleep(3)  # Atualiza a cada 3 segundos
+            await websocket.receive_text()
             
     except WebSocketDisconnect:
         logger.info("Cliente WebSocket desconectado")
     except Exception as e:
         logger.error(f"Erro no WebSocket: {e}")
+    finally:
+        active_ws.discard(websocket)
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    
+    loop = "uvloop" if install_uvloop() else "asyncio"
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop=loop, http="httptools")
@@ -0,0 +1,153 @@
+"""
+Cache do Mission Control
+Cache-aside com Redis (quando REDIS_URL está definido) ou memória local
+"""
+
+import asyncio
+import functools
+import hashlib
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "mission-control"
+
+# Backend Redis opcional
+_redis = None
+REDIS_URL = os.environ.get("REDIS_URL")
+if REDIS_URL:
+    try:
+        import redis.asyncio as redis_asyncio
+        _redis = redis_asyncio.from_url(REDIS_URL)
+        logger.info(f"Cache usando Redis em {REDIS_URL}")
+    except ImportError:
+        logger.warning("REDIS_URL definido mas pacote redis não instalado; usando cache em memória")
+
+# Fallback em memória: chave -> (expira_em, valor), limitado a MAX_MEMORY_ENTRIES
+MAX_MEMORY_ENTRIES = 256
+_memory: Dict[str, Tuple[float, Any]] = {}
+
+# Chamadas em andamento por chave (single-flight)
+_inflight: Dict[str, asyncio.Future] = {}
+
+_MISSING = object()
+
+
+def make_key(name: str, params: Optional[dict] = None) -> str:
+    """Monta a chave de cache a partir do nome e dos parâmetros"""
+    digest = hashlib.sha1(repr(sorted((params or {}).items())).encode()).hexdigest()[:16]
+    return f"{KEY_PREFIX}:{name}:{digest}"
+
+
+async def get(key: str) -> Any:
+    """Obtém um valor do cache (ou _MISSING se ausente/expirado)"""
+    if _redis is not None:
+        try:
+            raw = await _redis.get(key)
+        except Exception as e:
+            logger.warning(f"Erro lendo cache Redis: {e}")
+            return _MISSING
+        return _MISSING if raw is None else orjson.loads(raw)
+
+    entry = _memory.get(key)
+    if entry is None:
+        return _MISSING
+    expires_at, value = entry
+    if time.monotonic() >= expires_at:
+        _memory.pop(key, None)
+        return _MISSING
+    return value
+
+
+async def set(key: str, value: Any, ttl: float):
+    """Armazena um valor no cache por ttl segundos"""
+    if _redis is not None:
+        try:
+            await _redis.set(key, orjson.dumps(value), px=int(ttl * 1000))
+        except Exception as e:
+            logger.warning(f"Erro gravando cache Redis: {e}")
+        return
+
+    now = time.monotonic()
+    if key not in _memory and len(_memory) >= MAX_MEMORY_ENTRIES:
+        _evict(now)
+    _memory[key] = (now + ttl, value)
+
+
+def _evict(now: float):
+    """Remove entradas expiradas; se ainda estiver cheio, as mais antigas"""
+    for key in [k for k, (expires_at, _) in _memory.items() if now >= expires_at]:
+        del _memory[key]
+    while len(_memory) >= MAX_MEMORY_ENTRIES:
+        # dict preserva a ordem de inserção
+        del _memory[next(iter(_memory))]
+
+
+async def invalidate(prefix: str):
+    """Remove todas as chaves de um endpoint (ex: "subagents")"""
+    full_prefix = f"{KEY_PREFIX}:{prefix}"
+    if _redis is not None:
+        try:
+            keys = [k async for k in _redis.scan_iter(match=f"{full_prefix}*")]
+            if keys:
+                await _redis.delete(*keys)
+        except Exception as e:
+            logger.warning(f"Erro invalidando cache Redis: {e}")
+        return
+
+    for key in [k for k in _memory if k.startswith(full_prefix)]:
+        _memory.pop(key, None)
+
+
+def cached(name: str, ttl: float) -> Callable:
+    """Decorator cache-aside para endpoints async
+
+    O resultado é armazenado já convertido para JSON (dicts/listas), então
+    chamadas com cache hit ou miss retornam o mesmo formato. Em um miss,
+    chamadas concorrentes para a mesma chave aguardam uma única execução;
+    se ela for cancelada, uma das chamadas em espera a refaz.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = make_key(name, kwargs)
+            while True:
+                value = await get(key)
+                if value is not _MISSING:
+                    return value
+
+                inflight = _inflight.get(key)
+                if inflight is None:
+                    break
+                try:
+                    return await asyncio.shield(inflight)
+                except asyncio.CancelledError:
+                    # Só o líder foi cancelado: tenta de novo, e um dos que
+                    # aguardavam assume a execução
+                    if not inflight.cancelled() or asyncio.current_task().cancelling():
+                        raise
+
+            future = asyncio.get_running_loop().create_future()
+            _inflight[key] = future
+            try:
+                value = jsonable_encoder(await func(*args, **kwargs))
+                await set(key, value, ttl)
+                future.set_result(value)
+                return value
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                future.set_exception(e)
+                future.exception()  # Evita aviso de exceção não recuperada
+                raise
+            finally:
+                _inflight.pop(key, None)
+        return wrapper
+    return decorator
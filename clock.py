@@ -0,0 +1,52 @@
+"""
+Relógio em cache do Mission Control
+Timestamps com precisão de segundos, recalculados por uma task em background
+em vez de a cada requisição
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Callable, List
+
+REFRESH_INTERVAL = 0.5
+
+# Lidos como clock.now_iso / clock.now_hms (sempre o valor atual)
+now_iso: str = ""
+now_hms: str = ""
+
+# Tarefas periódicas registradas com every(): [intervalo, última execução, callback]
+_periodic: List[list] = []
+
+
+def tick():
+    """Recalcula os timestamps em cache"""
+    global now_iso, now_hms
+    now = datetime.now()
+    now_iso = now.isoformat(timespec="seconds")
+    now_hms = now.strftime("%H:%M:%S")
+
+
+def every(interval: float, callback: Callable[[], None]):
+    """Executa callback a cada `interval` segundos no loop do relógio
+
+    O callback também é executado uma vez no registro.
+    """
+    callback()
+    _periodic.append([interval, time.monotonic(), callback])
+
+
+async def run():
+    """Mantém os timestamps (e as tarefas periódicas) atualizados"""
+    while True:
+        tick()
+        now = time.monotonic()
+        for entry in _periodic:
+            interval, last, callback = entry
+            if now - last >= interval:
+                callback()
+                entry[1] = now
+        await asyncio.sleep(REFRESH_INTERVAL)
+
+
+tick()
@@ -0,0 +1,24 @@
+"""
+Geração de identificadores do Mission Control
+IDs curtos aleatórios e prefixos de timestamp para workflows e subagentes
+"""
+
+import os
+import time
+
+
+def short_id(nbytes: int = 4) -> str:
+    """Retorna um id hexadecimal aleatório com 2 * nbytes caracteres"""
+    return os.urandom(nbytes).hex()
+
+
+# Último segundo formatado: [segundo, "YYYYmmdd-HHMMSS"]
+_ts_cache = [0, ""]
+
+def timestamp_prefix() -> str:
+    """Retorna o timestamp atual como "YYYYmmdd-HHMMSS", formatado uma vez por segundo"""
+    now = int(time.time())
+    if now != _ts_cache[0]:
+        _ts_cache[0] = now
+        _ts_cache[1] = time.strftime("%Y%m%d-%H%M%S", time.localtime(now))
+    return _ts_cache[1]
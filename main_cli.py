@@ -4,18 +4,25 @@ Mission Control API - Versão CLI
 Usa comandos openclaw para obter dados
 """
 
-import subprocess
-import json
+import asyncio
 import logging
+import os
+import re
+from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import List, Optional, Dict, Any
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
+import orjson
 import uvicorn
 
+import cache
+import clock
+from schemas import READ_ONLY_MODEL_CONFIG
+
 # Configuração de logging
 logging.basicConfig(
     level=logging.INFO,
@@ -23,11 +30,21 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Gerencia ciclo de vida da aplicação"""
+    clock.tick()
+    clock_task = asyncio.create_task(clock.run())
+    yield
+    clock_task.cancel()
+
 # Criar app FastAPI
 app = FastAPI(
     title="Mission Control API",
     description="API de integração com OpenClaw via CLI",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS
@@ -41,12 +58,16 @@ app.add_middleware(
 
 # Modelos
 class StatusResponse(BaseModel):
+    model_config = READ_ONLY_MODEL_CONFIG
+    
     status: str
     timestamp: str
     version: str = "1.0.0"
     openclaw_available: bool
 
 class Session(BaseModel):
+    model_config = READ_ONLY_MODEL_CONFIG
+    
     key: str
     kind: str
     display_name: str
@@ -54,6 +75,8 @@ class Session(BaseModel):
     active: bool = True
 
 class Subagent(BaseModel):
+    model_config = READ_ONLY_MODEL_CONFIG
+    
     id: str
     task: str
     status: str
@@ -65,33 +88,176 @@ class CreateSubagentRequest(BaseModel):
     timeout: int = 600
 
 class Workflow(BaseModel):
+    model_config = READ_ONLY_MODEL_CONFIG
+    
     id: str
     name: str
     status: str
     progress: int
     created_at: str
 
+# Workflows simulados, montados uma vez e renovados periodicamente
+SIMULATED_REFRESH_INTERVAL = 60
+_SIMULATED_WORKFLOWS: List[Workflow] = []
+
+def _build_simulated_data():
+    """Monta a lista simulada de workflows"""
+    global _SIMULATED_WORKFLOWS
+    _SIMULATED_WORKFLOWS = [
+        Workflow.model_construct(
+            id="wf-001",
+            name="Deploy v2.5.0",
+            status="running",
+            progress=65,
+            created_at=clock.now_iso
+        ),
+        Workflow.model_construct(
+            id="wf-002",
+            name="Análise de Código",
+            status="completed",
+            progress=100,
+            created_at=clock.now_iso
+        )
+    ]
+
+clock.every(SIMULATED_REFRESH_INTERVAL, _build_simulated_data)
+
 # Funções auxiliares
-def run_openclaw_command(args: list) -> tuple:
+OPENCLAW_WORKSPACE = r"C:\Users\seuca\.openclaw\workspace"
+OPENCLAW_TIMEOUT = 30
+OPENCLAW_PROBE_TTL = 10  # segundos
+OPENCLAW_PROBE_TIMEOUT = 5  # segundos
+OPENCLAW_MAX_PROCS = int(os.environ.get("OPENCLAW_MAX_PROCS", "8"))
+
+# Limita quantos processos openclaw rodam ao mesmo tempo
+_openclaw_sem = asyncio.Semaphore(OPENCLAW_MAX_PROCS)
+
+# Último resultado da verificação do openclaw (mantido quando ela não conclui)
+_openclaw_available = False
+
+SESSIONS_LIST_ARGS = ["sessions", "list", "--kinds", "subagent", "--limit", "20"]
+
+# Suporte a `--output json` no `sessions list` (None = ainda não detectado)
+_openclaw_json_output: Optional[bool] = None
+
+# Parse da saída de `openclaw sessions list`
+_SESSION_RE = re.compile(
+    r"^(?P<key>agent:\S*)(?:[^\n]*?displayName=(?P<name>\S+))?",
+    re.MULTILINE
+)
+# Erro do openclaw para opção desconhecida (ex: versões sem --output)
+_UNKNOWN_OPTION_RE = re.compile(
+    r"unknown (?:option|argument)|unrecognized|unexpected argument",
+    re.IGNORECASE
+)
+_SUBAGENT_RE = re.compile(
+    r"^(?:agent:|[^\n]*(?i:subagent))[^\n]*",
+    re.MULTILINE
+)
+
+# TTLs do cache (segundos)
+CACHE_TTL_SESSIONS = 20
+CACHE_TTL_SUBAGENTS = 20
+CACHE_TTL_STATS = 10
+CACHE_TTL_WORKFLOWS = 20
+
+def _decode_output(data: bytes) -> str:
+    """Decodifica a saída do processo com quebras de linha universais (como text=True)"""
+    return data.decode(errors="replace").replace("\r\n", "\n").replace("\r", "\n")
+
+async def _exec_openclaw(args: list, timeout: float = OPENCLAW_TIMEOUT) -> tuple:
+    """Executa comando openclaw; timeout e openclaw ausente propagam como exceção"""
+    async with _openclaw_sem:
+        proc = None
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                "openclaw", *args,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=OPENCLAW_WORKSPACE
+            )
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout)
+            return _decode_output(stdout), _decode_output(stderr), proc.returncode
+        finally:
+            # Timeout, erro ou chamador cancelado: não deixa o processo órfão
+            if proc and proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+
+async def run_openclaw_command(args: list) -> tuple:
     """Executa comando openclaw e retorna (stdout, stderr, returncode)"""
     try:
-        cmd = ["openclaw"] + args
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=30,
-            cwd=r"C:\Users\seuca\.openclaw\workspace"
-        )
-        return result.stdout, result.stderr, result.returncode
+        return await _exec_openclaw(args)
     except Exception as e:
         logger.error(f"Erro ao executar comando: {e}")
         return "", str(e), 1
 
-def check_openclaw() -> bool:
-    """Verifica se openclaw está disponível"""
-    stdout, stderr, code = run_openclaw_command(["--version"])
-    return code == 0
+@cache.cached("openclaw-probe", ttl=OPENCLAW_PROBE_TTL)
+async def check_openclaw() -> bool:
+    """Verifica se openclaw está disponível
+
+    O resultado fica em cache por alguns segundos e chamadas simultâneas
+    compartilham uma única execução de `openclaw --version`.
+    """
+    global _openclaw_available
+    
+    try:
+        stdout, stderr, code = await _exec_openclaw(["--version"], timeout=OPENCLAW_PROBE_TIMEOUT)
+    except asyncio.TimeoutError:
+        # Mantém o último valor conhecido em vez de derrubar o endpoint
+        # (tratado antes de OSError, da qual TimeoutError é subclasse)
+        logger.warning("Verificação do openclaw excedeu o tempo limite")
+        return _openclaw_available
+    except OSError as e:
+        # Executável ausente ou sem permissão
+        logger.warning(f"openclaw indisponível: {e}")
+        code = 1
+    
+    _openclaw_available = code == 0
+    return _openclaw_available
+
+def _parse_json_rows(stdout: str) -> Optional[list]:
+    """Extrai as linhas da saída JSON do openclaw (None se não for JSON)"""
+    try:
+        data = orjson.loads(stdout)
+    except orjson.JSONDecodeError:
+        return None
+    if isinstance(data, dict):
+        data = data.get("sessions", [])
+    return data if isinstance(data, list) else None
+
+async def list_openclaw_sessions() -> tuple:
+    """Executa `openclaw sessions list` e retorna (rows, stdout, stderr, returncode)
+
+    Prefere a saída JSON; rows é None quando a saída veio em texto e
+    precisa ser interpretada com as regex. O suporte a JSON é decidido só
+    pelo resultado da chamada com `--output json`: uma falha qualquer do
+    openclaw é devolvida como está, sem repetir o comando em texto.
+    """
+    global _openclaw_json_output
+    
+    if _openclaw_json_output is False:
+        stdout, stderr, code = await run_openclaw_command(SESSIONS_LIST_ARGS)
+        return None, stdout, stderr, code
+    
+    stdout, stderr, code = await run_openclaw_command(SESSIONS_LIST_ARGS + ["--output", "json"])
+    if code == 0:
+        rows = _parse_json_rows(stdout)
+        if rows is not None:
+            _openclaw_json_output = True
+            return rows, stdout, stderr, code
+        if _openclaw_json_output is None:
+            # Opção ignorada: a saída já é o texto
+            logger.info("openclaw sem suporte a --output json; usando saída em texto")
+            _openclaw_json_output = False
+        return None, stdout, stderr, code
+    
+    if _openclaw_json_output is None and _UNKNOWN_OPTION_RE.search(stderr):
+        logger.info("openclaw sem suporte a --output json; usando saída em texto")
+        _openclaw_json_output = False
+        stdout, stderr, code = await run_openclaw_command(SESSIONS_LIST_ARGS)
+    
+    return None, stdout, stderr, code
 
 # Endpoints
 @app.get("/api/status", response_model=StatusResponse)
@@ -99,62 +265,86 @@ async def get_status():
     """Status da API"""
     return StatusResponse(
         status="online",
-        timestamp=datetime.now().isoformat(),
-        openclaw_available=check_openclaw()
+        timestamp=clock.now_iso,
+        openclaw_available=await check_openclaw()
     )
 
-@app.get("/api/sessions", response_model=List[Session])
+@app.get("/api/sessions", responses={200: {"model": List[Session]}})
+@cache.cached("sessions", ttl=CACHE_TTL_SESSIONS)
 async def get_sessions():
     """Lista sessões ativas do OpenClaw"""
-    stdout, stderr, code = run_openclaw_command([
-        "sessions", "list",
-        "--kinds", "subagent",
-        "--limit", "20"
-    ])
+    rows, stdout, stderr, code = await list_openclaw_sessions()
     
     if code != 0:
         logger.error(f"Erro ao listar sessões: {stderr}")
         raise HTTPException(status_code=500, detail="Erro ao listar sessões")
     
     try:
-        # Parse do output (formato texto para JSON)
-        sessions = []
-        lines = stdout.strip().split('\n')
-        for line in lines:
-            if line.startswith('agent:'):
-                parts = line.split()
-                sessions.append(Session(
-                    key=parts[0] if parts else "unknown",
-                    kind="subagent",
-                    display_name=line.split('displayName=')[1].split()[0] if 'displayName=' in line else "Unknown",
-                    total_tokens=0,
+        if rows is not None:
+            return [
+                Session.model_construct(
+                    key=r.get("key", "unknown"),
+                    kind=r.get("kind", "subagent"),
+                    display_name=r.get("displayName") or "Unknown",
+                    total_tokens=r.get("totalTokens") or 0,
                     active=True
-                ))
-        return sessions
+                )
+                for r in rows
+            ]
+        
+        # Parse do output (formato texto para JSON)
+        return [
+            Session.model_construct(
+                key=m["key"],
+                kind="subagent",
+                display_name=m["name"] or "Unknown",
+                total_tokens=0,
+                active=True
+            )
+            for m in _SESSION_RE.finditer(stdout.strip())
+        ]
     except Exception as e:
         logger.error(f"Erro ao parsear sessões: {e}")
         return []
 
-@app.get("/api/subagents", response_model=List[Subagent])
+@app.get("/api/subagents", responses={200: {"model": List[Subagent]}})
+@cache.cached("subagents", ttl=CACHE_TTL_SUBAGENTS)
 async def get_subagents():
     """Lista subagentes rodando"""
-    stdout, stderr, code = run_openclaw_command([
-        "sessions", "list",
-        "--kinds", "subagent",
-        "--limit", "20"
-    ])
+    rows, stdout, stderr, code = await list_openclaw_sessions()
+    created_at = clock.now_iso
+    
+    if rows is not None:
+        try:
+            return [
+                Subagent.model_construct(
+                    id=f"subagent-{i}",
+                    task=r.get("task") or r.get("displayName") or "",
+                    status=r.get("status", "running"),
+                    created_at=r.get("createdAt") or created_at
+                )
+                for i, r in enumerate(rows)
+            ]
+        except Exception as e:
+            logger.error(f"Erro ao parsear subagentes: {e}")
+            return []
     
     subagents = []
-    lines = stdout.strip().split('\n')
+    output = stdout.strip()
+    line_no = 0
+    pos = 0
     
-    for i, line in enumerate(lines):
-        if 'subagent' in line.lower() or line.startswith('agent:'):
-            subagents.append(Subagent(
-                id=f"subagent-{i}",
-                task=line[:50] + "..." if len(line) > 50 else line,
-                status="running",
-                created_at=datetime.now().isoformat()
-            ))
+    for m in _SUBAGENT_RE.finditer(output):
+        # O id usa o número da linha na saída
+        line_no += output.count("\n", pos, m.start())
+        pos = m.start()
+        line = m.group()
+        subagents.append(Subagent.model_construct(
+            id=f"subagent-{line_no}",
+            task=line[:50] + "..." if len(line) > 50 else line,
+            status="running",
+            created_at=created_at
+        ))
     
     return subagents
 
@@ -163,7 +353,7 @@ async def create_subagent(request: CreateSubagentRequest):
     """Cria novo subagente"""
     label = request.label or f"subagent-{datetime.now().strftime('%H%M%S')}"
     
-    stdout, stderr, code = run_openclaw_command([
+    stdout, stderr, code = await run_openclaw_command([
         "sessions", "spawn",
         "--task", request.task,
         "--label", label,
@@ -173,6 +363,10 @@ async def create_subagent(request: CreateSubagentRequest):
     if code != 0:
         raise HTTPException(status_code=500, detail=f"Erro ao criar subagente: {stderr}")
     
+    # Subagentes também aparecem na lista de sessões e nas estatísticas
+    for prefix in ("subagents", "sessions", "stats"):
+        await cache.invalidate(prefix)
+    
     return {
         "id": label,
         "task": request.task,
@@ -191,28 +385,15 @@ async def stop_subagent(subagent_id: str):
         "message": "Comando enviado (subagente será finalizado automaticamente)"
     }
 
-@app.get("/api/workflows", response_model=List[Workflow])
+@app.get("/api/workflows", responses={200: {"model": List[Workflow]}})
+@cache.cached("workflows", ttl=CACHE_TTL_WORKFLOWS)
 async def get_workflows():
     """Lista workflows"""
     # Workflows são simulados por enquanto
-    return [
-        Workflow(
-            id="wf-001",
-            name="Deploy v2.5.0",
-            status="running",
-            progress=65,
-            created_at=datetime.now().isoformat()
-        ),
-        Workflow(
-            id="wf-002",
-            name="Análise de Código",
-            status="completed",
-            progress=100,
-            created_at=datetime.now().isoformat()
-        )
-    ]
+    return _SIMULATED_WORKFLOWS
 
 @app.get("/api/stats")
+@cache.cached("stats", ttl=CACHE_TTL_STATS)
 async def get_stats():
     """Estatísticas do sistema"""
     sessions = await get_subagents()
@@ -222,19 +403,28 @@ async def get_stats():
         "workflows_completed": 5,
         "agents_online": len(sessions),
         "failures": 0,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": clock.now_iso
     }
 
 @app.get("/api/logs")
 async def get_logs():
     """Logs do sistema"""
     return [
-        {"time": datetime.now().strftime("%H:%M:%S"), "level": "info", "message": "Sistema iniciado"},
-        {"time": datetime.now().strftime("%H:%M:%S"), "level": "info", "message": f"{len(await get_subagents())} subagentes ativos"}
+        {"time": clock.now_hms, "level": "info", "message": "Sistema iniciado"},
+        {"time": clock.now_hms, "level": "info", "message": f"{len(await get_subagents())} subagentes ativos"}
     ]
 
 if __name__ == "__main__":
     print("Iniciando Mission Control API (CLI Mode)...")
     print("URL: http://127.0.0.1:8000")
     print("")
-    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
+    
+    # uvloop não está disponível no Windows; cai para o loop padrão do asyncio
+    try:
+        import uvloop
+        uvloop.install()
+        loop = "uvloop"
+    except ImportError:
+        loop = "asyncio"
+    
+    uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info", loop=loop, http="httptools")
@@ -4,38 +4,98 @@ Conecta ao gateway OpenClaw para comunicação em tempo real
 """
 
 import asyncio
-import json
 import websockets
-from typing import Dict, List, Optional, Callable, Any
+from typing import Dict, List, Optional, Callable, Any, Tuple
 from datetime import datetime
 import logging
 
+from ids import short_id, timestamp_prefix
+
+try:
+    import orjson
+    
+    _loads = orjson.loads
+    
+    def _dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode()
+except ImportError:
+    import json
+    
+    _loads = json.loads
+    _dumps = json.dumps
+
 logger = logging.getLogger(__name__)
 
+# Fila de saída e tamanho máximo de um lote enviado num único frame
+OUTBOUND_QUEUE_SIZE = 1024
+MAX_BATCH_SIZE = 64
+
+# Tempo máximo aguardando a resposta de uma requisição (segundos). O gateway
+# não responde a todas (ex: get_session de uma sessão inexistente), então o
+# limite é o mesmo intervalo fixo que era esperado antes
+REQUEST_TIMEOUT = 0.5
+
+# Opções da conexão com o gateway (tráfego local e confiável): sem
+# permessage-deflate e com keepalive espaçado. O limite de 4 MiB por frame
+# também limita quanto tempo um parse pode travar o event loop
+WS_MAX_SIZE = 2 ** 22
+WS_PING_INTERVAL = 60
+
 class OpenClawClient:
     """Cliente WebSocket para comunicação com o gateway OpenClaw"""
     
-    def __init__(self, gateway_url: str = "ws://127.0.0.1:18789"):
+    def __init__(self, gateway_url: str = "ws://127.0.0.1:18789", batch_messages: bool = False):
         self.gateway_url = gateway_url
+        # Agrupa mensagens enfileiradas em um envelope {"type": "batch"}
+        # (só habilitar se o gateway souber desmontar o lote)
+        self.batch_messages = batch_messages
         self.websocket: Optional[websockets.WebSocketClientProtocol] = None
         self.connected = False
         self.sessions: Dict[str, Any] = {}
         self.subagents: Dict[str, Any] = {}
-        self.message_handlers: List[Callable] = []
+        # Handlers registrados; tupla substituída a cada alteração, então a
+        # iteração em _handle_message nunca vê a coleção mudar no meio
+        self._handlers_tuple: Tuple[Callable, ...] = ()
         self._reconnect_delay = 5
         self._running = False
+        self._out_q: asyncio.Queue = asyncio.Queue(maxsize=OUTBOUND_QUEUE_SIZE)
+        self._writer_task: Optional[asyncio.Task] = None
+        # Requisições aguardando resposta:
+        # request_id -> (tipo esperado, campos que a resposta deve ter, future)
+        self._pending: Dict[str, Tuple[Optional[str], dict, asyncio.Future]] = {}
+        # Subagentes aguardando conclusão: subagent_id -> future
+        self._subagent_done: Dict[str, asyncio.Future] = {}
+        # Tratamento interno por tipo de mensagem
+        self._handlers: Dict[str, Callable[[dict], None]] = {
+            "session_list": self._on_session_list,
+            "session_update": self._on_session_update,
+            "subagent_list": self._on_subagent_list,
+            "subagent_update": self._on_subagent_update,
+            "subagent_created": self._on_subagent_created,
+        }
         
     async def connect(self) -> bool:
-        """Conecta ao gateway OpenClaw"""
+        """Conecta ao gateway OpenClaw (reaproveita a conexão já aberta)"""
+        if self.connected and self.websocket:
+            return True
+        
         try:
             logger.info(f"Conectando ao OpenClaw em {self.gateway_url}...")
-            self.websocket = await websockets.connect(self.gateway_url)
+            self.websocket = await websockets.connect(
+                self.gateway_url,
+                compression=None,
+                max_size=WS_MAX_SIZE,
+                ping_interval=WS_PING_INTERVAL
+            )
             self.connected = True
             self._running = True
             logger.info("✅ Conectado ao OpenClaw!")
             
-            # Inicia loop de recebimento de mensagens
+            # Inicia loops de recebimento e envio de mensagens
             asyncio.create_task(self._receive_loop())
+            if self._writer_task:
+                self._writer_task.cancel()
+            self._writer_task = asyncio.create_task(self._writer_loop())
             
             # Envia mensagem de identificação
             await self._send({
@@ -53,26 +113,44 @@ class OpenClawClient:
     async def disconnect(self):
         """Desconecta do gateway"""
         self._running = False
+        if self._writer_task:
+            self._writer_task.cancel()
+            self._writer_task = None
         if self.websocket:
             await self.websocket.close()
         self.connected = False
         logger.info("Desconectado do OpenClaw")
     
     async def _send(self, message: dict):
-        """Envia mensagem para o gateway"""
+        """Enfileira mensagem para o gateway (enviada por _writer_loop)"""
         if self.websocket and self.connected:
+            await self._out_q.put(message)
+    
+    async def _writer_loop(self):
+        """Loop de envio: drena a fila de saída, agrupando mensagens se habilitado"""
+        while self._running and self.websocket:
+            message = await self._out_q.get()
+            
+            if self.batch_messages:
+                batch = [message]
+                while not self._out_q.empty() and len(batch) < MAX_BATCH_SIZE:
+                    batch.append(self._out_q.get_nowait())
+                if len(batch) > 1:
+                    message = {"type": "batch", "items": batch}
+            
             try:
-                await self.websocket.send(json.dumps(message))
+                await self.websocket.send(_dumps(message))
             except Exception as e:
                 logger.error(f"Erro ao enviar mensagem: {e}")
                 self.connected = False
+                break
     
     async def _receive_loop(self):
         """Loop de recebimento de mensagens"""
         while self._running and self.websocket:
             try:
                 message = await self.websocket.recv()
-                data = json.loads(message)
+                data = _loads(message)
                 await self._handle_message(data)
             except websockets.exceptions.ConnectionClosed:
                 logger.warning("Conexão WebSocket fechada")
@@ -86,61 +164,144 @@ class OpenClawClient:
         msg_type = data.get("type", "unknown")
         
         # Atualiza sessões e subagentes baseado nas mensagens
-        if msg_type == "session_list":
-            self.sessions = {s["id"]: s for s in data.get("sessions", [])}
-        elif msg_type == "session_update":
-            session_id = data.get("session_id")
-            if session_id:
-                self.sessions[session_id] = data.get("data", {})
-        elif msg_type == "subagent_list":
-            self.subagents = {s["id"]: s for s in data.get("subagents", [])}
-        elif msg_type == "subagent_update":
-            subagent_id = data.get("subagent_id")
-            if data.get("status") == "stopped":
-                self.subagents.pop(subagent_id, None)
-            elif subagent_id:
-                self.subagents[subagent_id] = data.get("data", {})
-        elif msg_type == "subagent_created":
-            subagent_id = data.get("subagent_id")
-            if subagent_id:
-                self.subagents[subagent_id] = data.get("data", {})
+        update = self._handlers.get(msg_type)
+        if update:
+            update(data)
+        
+        self._resolve_pending(msg_type, data)
         
         # Notifica handlers registrados
-        for handler in self.message_handlers:
+        for handler in self._handlers_tuple:
             try:
                 handler(data)
             except Exception as e:
                 logger.error(f"Erro no handler: {e}")
     
+    def _on_session_list(self, data: dict):
+        self.sessions = {s["id"]: s for s in data.get("sessions", [])}
+    
+    def _on_session_update(self, data: dict):
+        session_id = data.get("session_id")
+        if session_id:
+            self.sessions[session_id] = data.get("data", {})
+    
+    def _on_subagent_list(self, data: dict):
+        self.subagents = {s["id"]: s for s in data.get("subagents", [])}
+    
+    def _on_subagent_update(self, data: dict):
+        subagent_id = data.get("subagent_id")
+        if data.get("status") == "stopped":
+            self.subagents.pop(subagent_id, None)
+            self._resolve_subagent(subagent_id, data)
+        elif subagent_id:
+            self.subagents[subagent_id] = data.get("data", {})
+    
+    def _on_subagent_created(self, data: dict):
+        subagent_id = data.get("subagent_id")
+        if subagent_id:
+            self.subagents[subagent_id] = data.get("data", {})
+    
+    def _resolve_pending(self, msg_type: str, data: dict):
+        """Entrega a mensagem à requisição que aguarda por ela
+
+        Usa o request_id ecoado pelo gateway; sem ele, entrega à requisição
+        mais antiga que espera esse tipo de mensagem com os mesmos campos
+        (ex: o session_id de get_session).
+        """
+        rid = data.get("request_id")
+        if rid not in self._pending:
+            rid = next(
+                (r for r, (expect, match, _) in self._pending.items()
+                 if expect == msg_type and all(data.get(k) == v for k, v in match.items())),
+                None
+            )
+        if rid is None:
+            return
+        
+        _, _, future = self._pending.pop(rid)
+        if not future.done():
+            future.set_result(data)
+    
+    def _resolve_subagent(self, subagent_id: Optional[str], data: dict):
+        """Acorda quem aguarda a conclusão do subagente"""
+        future = self._subagent_done.pop(subagent_id, None)
+        if future and not future.done():
+            future.set_result(data)
+    
+    async def wait_subagent(self, subagent_id: str, timeout: Optional[float] = None) -> Optional[dict]:
+        """Aguarda o subagente terminar (None se não terminar a tempo)
+        
+        Retorna a mensagem subagent_update com status "stopped".
+        """
+        future = self._subagent_done.get(subagent_id)
+        if future is None:
+            future = self._subagent_done[subagent_id] = asyncio.get_running_loop().create_future()
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Subagente {subagent_id} não concluiu em {timeout}s")
+            return None
+        finally:
+            # Timeout ou cancelamento: não deixa o future registrado
+            if self._subagent_done.get(subagent_id) is future:
+                del self._subagent_done[subagent_id]
+    
+    async def _request(self, payload: dict, expect: Optional[str] = None,
+                       timeout: float = REQUEST_TIMEOUT, match: Optional[dict] = None) -> Optional[dict]:
+        """Envia uma requisição e aguarda a resposta (None se não chegar a tempo)
+
+        Sem request_id ecoado, a resposta é reconhecida pelo tipo `expect`
+        e pelos campos de `match`; sem `expect` só o eco a resolve.
+        """
+        if not (self.websocket and self.connected):
+            return None
+        
+        rid = short_id(6)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[rid] = (expect, match or {}, future)
+        try:
+            await self._send({**payload, "request_id": rid})
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Sem resposta do gateway para '{payload.get('type')}'")
+            return None
+        finally:
+            self._pending.pop(rid, None)
+    
+    @property
+    def message_handlers(self) -> Tuple[Callable, ...]:
+        """Handlers registrados (somente leitura)"""
+        return self._handlers_tuple
+    
     def add_message_handler(self, handler: Callable):
         """Registra um handler para mensagens"""
-        self.message_handlers.append(handler)
+        self._handlers_tuple = self._handlers_tuple + (handler,)
+    
+    def remove_message_handler(self, handler: Callable):
+        """Remove um handler registrado"""
+        self._handlers_tuple = tuple(h for h in self._handlers_tuple if h is not handler)
     
     async def get_sessions(self) -> List[dict]:
         """Obtém lista de sessões ativas"""
-        await self._send({"type": "get_sessions"})
-        # Aguarda resposta (em uma implementação real, usaríamos um Future)
-        await asyncio.sleep(0.5)
+        await self._request({"type": "get_sessions"}, expect="session_list")
         return list(self.sessions.values())
     
     async def get_session(self, session_id: str) -> Optional[dict]:
         """Obtém detalhes de uma sessão específica"""
-        await self._send({
+        await self._request({
             "type": "get_session",
             "session_id": session_id
-        })
-        await asyncio.sleep(0.5)
+        }, expect="session_update", match={"session_id": session_id})
         return self.sessions.get(session_id)
     
     async def get_subagents(self) -> List[dict]:
         """Obtém lista de subagentes"""
-        await self._send({"type": "get_subagents"})
-        await asyncio.sleep(0.5)
+        await self._request({"type": "get_subagents"}, expect="subagent_list")
         return list(self.subagents.values())
     
     async def create_subagent(self, task: str, label: str = None, model: str = None) -> dict:
         """Cria um novo subagente"""
-        subagent_id = f"subagent-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{len(self.subagents)}"
+        subagent_id = f"subagent-{timestamp_prefix()}-{short_id(2)}"
         
         await self._send({
             "type": "spawn_subagent",
@@ -165,12 +326,13 @@ class OpenClawClient:
             "subagent_id": subagent_id
         })
         self.subagents.pop(subagent_id, None)
+        self._resolve_subagent(subagent_id, {"subagent_id": subagent_id, "status": "stopped"})
         return True
     
     async def get_system_status(self) -> dict:
         """Obtém status do sistema OpenClaw"""
+        # A resposta não é usada: o status vem do estado local
         await self._send({"type": "get_status"})
-        await asyncio.sleep(0.5)
         
         return {
             "connected": self.connected,
@@ -182,12 +344,25 @@ class OpenClawClient:
     
     async def get_logs(self, limit: int = 100) -> List[dict]:
         """Obtém logs do sistema"""
-        await self._send({
+        response = await self._request({
             "type": "get_logs",
             "limit": limit
-        })
-        await asyncio.sleep(0.5)
-        return []  # Será preenchido via callback
+        }, expect="log_list")
+        return response.get("logs", []) if response else []
+
+
+def install_uvloop() -> bool:
+    """Usa o uvloop como event loop do asyncio, se estiver instalado
+
+    Deve ser chamado no ponto de entrada, antes de o loop ser criado.
+    uvloop não existe no Windows; nesse caso mantém o loop padrão.
+    """
+    try:
+        import uvloop
+    except ImportError:
+        return False
+    uvloop.install()
+    return True
 
 
 # Singleton do cliente
@@ -198,5 +373,5 @@ async def get_openclaw_client() -> OpenClawClient:
     global _client
     if _client is None:
         _client = OpenClawClient()
-        await _client.connect()
+    await _client.connect()
     return _client
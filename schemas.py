@@ -0,0 +1,8 @@
+"""
+Configuração comum dos modelos Pydantic do Mission Control
+"""
+
+from pydantic import ConfigDict
+
+# Modelos de resposta são montados a partir de dados do próprio servidor
+READ_ONLY_MODEL_CONFIG = ConfigDict(frozen=True, extra="ignore")
@@ -3,15 +3,36 @@ Sistema de Workflows do Mission Control
 Gerencia workflows, etapas e execução via subagentes
 """
 
-import uuid
-from typing import Dict, List, Optional, Any
+import bisect
+import itertools
+import operator
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Any, Tuple
 from datetime import datetime
 from enum import Enum
 import asyncio
 import logging
 
+import orjson
+
+from ids import short_id, timestamp_prefix
+
 logger = logging.getLogger(__name__)
 
+# Chave de ordenação dos índices de workflows
+_by_created_at = operator.attrgetter("created_at")
+
+def _log_time() -> str:
+    t = time.localtime()
+    return f"{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}"
+
+
+# Logs mantidos por workflow e quantos são expostos em to_dict
+MAX_WORKFLOW_LOGS = 200
+RECENT_WORKFLOW_LOGS = 20
+
 
 class WorkflowStatus(str, Enum):
     PENDING = "pendente"
@@ -29,33 +50,64 @@ class StepStatus(str, Enum):
     SKIPPED = "pulado"
 
 
+@dataclass(slots=True, eq=False)
 class WorkflowStep:
     """Representa uma etapa de um workflow"""
     
-    def __init__(
-        self,
-        name: str,
-        description: str = "",
-        agent_type: str = "assistente",
-        task_template: str = "",
-        depends_on: List[str] = None,
-        timeout_minutes: int = 30
-    ):
-        self.id = str(uuid.uuid4())[:8]
-        self.name = name
-        self.description = description
-        self.agent_type = agent_type
-        self.task_template = task_template
-        self.depends_on = depends_on or []
-        self.timeout_minutes = timeout_minutes
-        self.status = StepStatus.PENDING
-        self.started_at: Optional[datetime] = None
-        self.completed_at: Optional[datetime] = None
-        self.result: Optional[str] = None
-        self.error: Optional[str] = None
-        self.subagent_id: Optional[str] = None
+    name: str
+    description: str = ""
+    agent_type: str = "assistente"
+    task_template: str = ""
+    depends_on: Tuple[str, ...] = ()
+    timeout_minutes: int = 30
+    # Estado de execução (não faz parte do construtor)
+    id: str = field(default_factory=short_id, init=False)
+    status: StepStatus = field(default=StepStatus.PENDING, init=False)
+    started_at: Optional[datetime] = field(default=None, init=False)
+    completed_at: Optional[datetime] = field(default=None, init=False)
+    result: Optional[str] = field(default=None, init=False)
+    error: Optional[str] = field(default=None, init=False)
+    subagent_id: Optional[str] = field(default=None, init=False)
+    # Forma ISO de started_at/completed_at, gravada por set_started/set_completed
+    _started_at_iso: Optional[str] = field(default=None, init=False, repr=False)
+    _completed_at_iso: Optional[str] = field(default=None, init=False, repr=False)
+    _dict_cache: Optional[dict] = field(default=None, init=False, repr=False)
+    
+    def __post_init__(self):
+        if not isinstance(self.depends_on, tuple):
+            self.depends_on = tuple(self.depends_on)
+    
+    def invalidate(self):
+        """Descarta o dict serializado; chamar após alterar a etapa"""
+        self._dict_cache = None
+    
+    def set_started(self, when: datetime):
+        self.started_at = when
+        self._started_at_iso = when.isoformat()
+        self._dict_cache = None
+    
+    def set_completed(self, when: datetime):
+        self.completed_at = when
+        self._completed_at_iso = when.isoformat()
+        self._dict_cache = None
+    
+    def clone(self) -> "WorkflowStep":
+        """Cria uma nova etapa pendente a partir desta (usada como protótipo)"""
+        return WorkflowStep(
+            self.name,
+            self.description,
+            self.agent_type,
+            self.task_template,
+            self.depends_on,
+            self.timeout_minutes
+        )
     
     def to_dict(self) -> dict:
+        if self._dict_cache is None:
+            self._dict_cache = self._build_dict()
+        return self._dict_cache
+    
+    def _build_dict(self) -> dict:
         return {
             "id": self.id,
             "name": self.name,
@@ -63,44 +115,69 @@ class WorkflowStep:
             "agent_type": self.agent_type,
             "status": self.status.value,
             "depends_on": self.depends_on,
-            "started_at": self.started_at.isoformat() if self.started_at else None,
-            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
+            "started_at": self._started_at_iso,
+            "completed_at": self._completed_at_iso,
             "result": self.result,
             "error": self.error,
             "subagent_id": self.subagent_id
         }
 
 
+def _workflow_id() -> str:
+    return f"wf-{timestamp_prefix()}-{short_id(2)}"
+
+
+@dataclass(slots=True, eq=False)
 class Workflow:
     """Representa um workflow completo"""
     
-    def __init__(
-        self,
-        name: str,
-        description: str = "",
-        team: str = "",
-        created_by: str = "system"
-    ):
-        self.id = f"wf-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{str(uuid.uuid4())[:4]}"
-        self.name = name
-        self.description = description
-        self.team = team
-        self.created_by = created_by
-        self.status = WorkflowStatus.PENDING
-        self.steps: List[WorkflowStep] = []
-        self.created_at = datetime.now()
-        self.started_at: Optional[datetime] = None
-        self.completed_at: Optional[datetime] = None
-        self.current_step_index = 0
-        self.logs: List[dict] = []
+    name: str
+    description: str = ""
+    team: str = ""
+    created_by: str = "system"
+    # Estado de execução (não faz parte do construtor)
+    id: str = field(default_factory=_workflow_id, init=False)
+    status: WorkflowStatus = field(default=WorkflowStatus.PENDING, init=False)
+    steps: List[WorkflowStep] = field(default_factory=list, init=False)
+    created_at: datetime = field(default_factory=datetime.now, init=False)
+    started_at: Optional[datetime] = field(default=None, init=False)
+    completed_at: Optional[datetime] = field(default=None, init=False)
+    current_step_index: int = field(default=0, init=False)
+    logs: Deque[dict] = field(default_factory=lambda: deque(maxlen=MAX_WORKFLOW_LOGS), init=False)
+    # Últimos logs expostos em to_dict
+    _recent_logs: Deque[dict] = field(default_factory=lambda: deque(maxlen=RECENT_WORKFLOW_LOGS), init=False, repr=False)
+    # Etapas concluídas, mantido por set_step_status
+    _completed_steps: int = field(default=0, init=False, repr=False)
+    # Forma ISO dos campos datetime, gravada junto com eles
+    _created_at_iso: str = field(default="", init=False, repr=False)
+    _started_at_iso: Optional[str] = field(default=None, init=False, repr=False)
+    _completed_at_iso: Optional[str] = field(default=None, init=False, repr=False)
+    _dict_cache: Optional[dict] = field(default=None, init=False, repr=False)
+    _duration_ts: float = field(default=0.0, init=False, repr=False)
+    
+    def __post_init__(self):
+        self._created_at_iso = self.created_at.isoformat()
+    
+    def invalidate(self):
+        """Descarta o dict serializado; chamar após alterar o workflow"""
+        self._dict_cache = None
+    
+    def set_started(self, when: datetime):
+        self.started_at = when
+        self._started_at_iso = when.isoformat()
+        self._dict_cache = None
+    
+    def set_completed(self, when: datetime):
+        self.completed_at = when
+        self._completed_at_iso = when.isoformat()
+        self._dict_cache = None
     
     @property
     def progress(self) -> int:
         """Calcula progresso em porcentagem"""
         if not self.steps:
             return 0
-        completed = sum(1 for s in self.steps if s.status == StepStatus.COMPLETED)
-        return int((completed / len(self.steps)) * 100)
+        return (self._completed_steps * 100) // len(self.steps)
     
     @property
     def duration(self) -> str:
@@ -117,16 +194,50 @@ class Workflow:
     def add_step(self, step: WorkflowStep):
         """Adiciona uma etapa ao workflow"""
         self.steps.append(step)
+        if step.status == StepStatus.COMPLETED:
+            self._completed_steps += 1
+        self._dict_cache = None
+    
+    def set_step_status(self, step: WorkflowStep, status: StepStatus):
+        """Altera o status de uma etapa mantendo a contagem de concluídas"""
+        was_completed = step.status == StepStatus.COMPLETED
+        step.status = status
+        step._dict_cache = None
+        self._completed_steps += (status == StepStatus.COMPLETED) - was_completed
+        self._dict_cache = None
+    
+    def mark_step_completed(self, step: WorkflowStep):
+        """Marca uma etapa como concluída"""
+        self.set_step_status(step, StepStatus.COMPLETED)
     
     def add_log(self, level: str, message: str):
         """Adiciona entrada de log"""
-        self.logs.append({
-            "time": datetime.now().strftime("%H:%M:%S"),
+        entry = {
+            "time": _log_time(),
             "level": level,
             "message": message
-        })
+        }
+        self.logs.append(entry)
+        self._recent_logs.append(entry)
+        self._dict_cache = None
     
     def to_dict(self) -> dict:
+        """Serializa o workflow, reaproveitando o resultado enquanto nada mudar"""
+        steps = [s.to_dict() for s in self.steps]
+        cached = self._dict_cache
+        
+        # Etapas alteradas geram um novo dict (to_dict da etapa é memoizado)
+        if cached is None or any(a is not b for a, b in zip(cached["steps"], steps)):
+            cached = self._dict_cache = self._build_dict(steps)
+            self._duration_ts = time.monotonic()
+        elif self.started_at and not self.completed_at and time.monotonic() - self._duration_ts >= 1:
+            # Em execução: só a duração avança, no máximo uma vez por segundo
+            cached = self._dict_cache = {**cached, "duration": self.duration}
+            self._duration_ts = time.monotonic()
+        
+        return cached
+    
+    def _build_dict(self, steps: List[dict]) -> dict:
         return {
             "id": self.id,
             "name": self.name,
@@ -135,19 +246,20 @@ class Workflow:
             "status": self.status.value,
             "progress": self.progress,
             "duration": self.duration,
-            "created_at": self.created_at.isoformat(),
-            "started_at": self.started_at.isoformat() if self.started_at else None,
-            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
-            "steps": [s.to_dict() for s in self.steps],
+            "created_at": self._created_at_iso,
+            "started_at": self._started_at_iso,
+            "completed_at": self._completed_at_iso,
+            "steps": steps,
             "current_step": self.current_step_index,
-            "logs": self.logs[-20:]  # Últimos 20 logs
+            "logs": list(self._recent_logs)
         }
 
 
 class WorkflowManager:
     """Gerencia todos os workflows do sistema"""
     
-    # Templates predefinidos
+    # Templates predefinidos (depends_on referencia etapas pelo nome;
+    # etapas sem dependências podem rodar em paralelo)
     TEMPLATES = {
         "ci-cd": {
             "name": "CI/CD Pipeline",
@@ -163,19 +275,22 @@ class WorkflowManager:
                     "name": "Testes Unitários",
                     "description": "Execução de testes automatizados",
                     "agent_type": "testador",
-                    "task_template": "Execute todos os testes unitários e gere relatório de cobertura."
+                    "task_template": "Execute todos os testes unitários e gere relatório de cobertura.",
+                    "depends_on": ["Revisão de Código"]
                 },
                 {
                     "name": "Testes de Integração",
                     "description": "Testes de integração entre componentes",
                     "agent_type": "testador",
-                    "task_template": "Execute testes de integração e verifique comunicação entre serviços."
+                    "task_template": "Execute testes de integração e verifique comunicação entre serviços.",
+                    "depends_on": ["Revisão de Código"]
                 },
                 {
                     "name": "Deploy",
                     "description": "Deploy da aplicação em produção",
                     "agent_type": "deployer",
-                    "task_template": "Realize o deploy da aplicação seguindo o checklist de deploy."
+                    "task_template": "Realize o deploy da aplicação seguindo o checklist de deploy.",
+                    "depends_on": ["Testes Unitários", "Testes de Integração"]
                 }
             ]
         },
@@ -199,7 +314,8 @@ class WorkflowManager:
                     "name": "Relatório",
                     "description": "Geração de relatório consolidado",
                     "agent_type": "analista",
-                    "task_template": "Compile relatório com todas as findings e recomendações."
+                    "task_template": "Compile relatório com todas as findings e recomendações.",
+                    "depends_on": ["Análise Estática", "Análise de Segurança"]
                 }
             ]
         },
@@ -217,21 +333,60 @@ class WorkflowManager:
                     "name": "Investigação",
                     "description": "Investiga preliminar do problema",
                     "agent_type": "especialista",
-                    "task_template": "Investigue logs e identifique possíveis causas root."
+                    "task_template": "Investigue logs e identifique possíveis causas root.",
+                    "depends_on": ["Classificação"]
                 },
                 {
                     "name": "Escalonamento",
                     "description": "Encaminha para equipe adequada",
                     "agent_type": "gerente",
-                    "task_template": "Determine qual equipe deve resolver o ticket."
+                    "task_template": "Determine qual equipe deve resolver o ticket.",
+                    "depends_on": ["Investigação"]
                 }
             ]
         }
     }
     
+    # Etapas de cada template montadas uma vez; create_workflow clona as etapas
+    TEMPLATE_PROTOTYPES = {
+        key: [WorkflowStep(**step_data) for step_data in data["steps"]]
+        for key, data in TEMPLATES.items()
+    }
+    
+    # Resumo retornado por get_templates (somente leitura)
+    _TEMPLATES_SUMMARY = [
+        {
+            "id": key,
+            "name": data["name"],
+            "description": data["description"],
+            "steps_count": len(data["steps"])
+        }
+        for key, data in TEMPLATES.items()
+    ]
+    
     def __init__(self):
         self.workflows: Dict[str, Workflow] = {}
         self._running: Dict[str, asyncio.Task] = {}
+        # Índice por status, cada lista ordenada por created_at (crescente)
+        self._by_status: Dict[WorkflowStatus, List[Workflow]] = {s: [] for s in WorkflowStatus}
+        # Último snapshot serializado e os dicts que o geraram
+        self._snapshot: bytes = b"[]"
+        self._snapshot_dicts: List[dict] = []
+    
+    def _set_status(self, workflow: Workflow, status: WorkflowStatus):
+        """Altera o status de um workflow mantendo o índice por status"""
+        if workflow.status == status:
+            return
+        
+        old = self._by_status[workflow.status]
+        i = bisect.bisect_left(old, workflow.created_at, key=_by_created_at)
+        while old[i] is not workflow:
+            i += 1
+        del old[i]
+        
+        workflow.status = status
+        workflow.invalidate()
+        bisect.insort(self._by_status[status], workflow, key=_by_created_at)
     
     def create_workflow(
         self,
@@ -249,16 +404,17 @@ class WorkflowManager:
             template_data = self.TEMPLATES[template]
             workflow.description = description or template_data["description"]
             
-            for step_data in template_data["steps"]:
-                step = WorkflowStep(
-                    name=step_data["name"],
-                    description=step_data["description"],
-                    agent_type=step_data["agent_type"],
-                    task_template=step_data["task_template"]
-                )
+            steps = [prototype.clone() for prototype in self.TEMPLATE_PROTOTYPES[template]]
+            
+            # Traduz dependências por nome para os ids das etapas clonadas
+            ids_by_name = {step.name: step.id for step in steps}
+            for step in steps:
+                if step.depends_on:
+                    step.depends_on = tuple(ids_by_name.get(dep, dep) for dep in step.depends_on)
                 workflow.add_step(step)
         
         self.workflows[workflow.id] = workflow
+        bisect.insort(self._by_status[workflow.status], workflow, key=_by_created_at)
         workflow.add_log("info", f"Workflow '{name}' criado")
         logger.info(f"Workflow criado: {workflow.id}")
         
@@ -273,16 +429,28 @@ class WorkflowManager:
         status: Optional[WorkflowStatus] = None,
         limit: int = 50
     ) -> List[Workflow]:
-        """Lista workflows com filtros opcionais"""
-        workflows = list(self.workflows.values())
-        
+        """Lista workflows com filtros opcionais (mais recente primeiro)"""
         if status:
-            workflows = [w for w in workflows if w.status == status]
-        
-        # Ordena por data de criação (mais recente primeiro)
-        workflows.sort(key=lambda w: w.created_at, reverse=True)
+            workflows = reversed(self._by_status[status])
+        else:
+            # self.workflows já está em ordem de criação
+            workflows = reversed(self.workflows.values())
         
-        return workflows[:limit]
+        return list(itertools.islice(workflows, max(limit, 0)))
+    
+    def snapshot_bytes(self, limit: int = 200) -> bytes:
+        """Lista de workflows serializada em JSON, reaproveitada enquanto nada mudar
+
+        Como Workflow.to_dict é memoizado, basta comparar a identidade dos
+        dicts para saber se é preciso serializar de novo.
+        """
+        dicts = [w.to_dict() for w in self.list_workflows(limit=limit)]
+        if len(dicts) != len(self._snapshot_dicts) or any(
+            a is not b for a, b in zip(dicts, self._snapshot_dicts)
+        ):
+            self._snapshot = orjson.dumps(dicts)
+            self._snapshot_dicts = dicts
+        return self._snapshot
     
     async def start_workflow(self, workflow_id: str, openclaw_client=None) -> bool:
         """Inicia execução de um workflow"""
@@ -294,8 +462,8 @@ class WorkflowManager:
             logger.warning(f"Workflow {workflow_id} já está em execução")
             return False
         
-        workflow.status = WorkflowStatus.RUNNING
-        workflow.started_at = datetime.now()
+        self._set_status(workflow, WorkflowStatus.RUNNING)
+        workflow.set_started(datetime.now())
         workflow.add_log("info", "Workflow iniciado")
         
         # Inicia execução em background
@@ -306,70 +474,122 @@ class WorkflowManager:
         return True
     
     async def _execute_workflow(self, workflow: Workflow, openclaw_client=None):
-        """Executa as etapas do workflow"""
+        """Executa as etapas do workflow
+
+        Etapas cujas dependências já foram concluídas rodam em paralelo;
+        cada etapa é iniciada assim que a última de suas dependências termina.
+        """
+        running: Dict[asyncio.Task, WorkflowStep] = {}
         try:
-            for i, step in enumerate(workflow.steps):
-                workflow.current_step_index = i
-                
-                # Verifica dependências
-                pending_deps = [
-                    s for s in workflow.steps 
-                    if s.id in step.depends_on and s.status != StepStatus.COMPLETED
-                ]
-                if pending_deps:
-                    step.status = StepStatus.PENDING
-                    workflow.add_log("warning", f"Etapa '{step.name}' aguardando dependências")
-                    continue
-                
-                # Executa etapa
-                step.status = StepStatus.RUNNING
-                step.started_at = datetime.now()
-                workflow.add_log("info", f"Etapa '{step.name}' iniciada")
+            steps = workflow.steps
+            index = {s.id: i for i, s in enumerate(steps)}
+            
+            # Dependências ainda não resolvidas de cada etapa (ids desconhecidos são ignorados)
+            remaining = {s.id: {d for d in s.depends_on if d in index} for s in steps}
+            dependents: Dict[str, List[WorkflowStep]] = defaultdict(list)
+            for step in steps:
+                for dep in remaining[step.id]:
+                    dependents[dep].append(step)
+            
+            def launch(step: WorkflowStep):
+                workflow.current_step_index = index[step.id]
+                workflow.invalidate()
+                task = asyncio.create_task(self._run_step(workflow, step, openclaw_client))
+                running[task] = step
+            
+            for step in steps:
+                if not remaining[step.id]:
+                    launch(step)
+            
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
                 
-                try:
-                    # Aqui integraria com subagentes reais via openclaw_client
-                    if openclaw_client:
-                        # Cria subagente para executar a tarefa
-                        result = await openclaw_client.create_subagent(
-                            task=step.task_template,
-                            label=f"{workflow.name} - {step.name}"
-                        )
-                        step.subagent_id = result.get("id")
-                        
-                        # Simula execução (em produção, aguardaria conclusão)
-                        await asyncio.sleep(5)  # Simula tempo de execução
-                    else:
-                        # Modo simulado para testes
-                        await asyncio.sleep(2)
-                    
-                    step.status = StepStatus.COMPLETED
-                    step.completed_at = datetime.now()
-                    step.result = "Concluído com sucesso"
-                    workflow.add_log("success", f"Etapa '{step.name}' concluída")
+                for task in done:
+                    step = running.pop(task)
+                    if not task.result():
+                        # Etapa falhou: aborta o workflow
+                        self._set_status(workflow, WorkflowStatus.FAILED)
+                        continue
                     
-                except Exception as e:
-                    step.status = StepStatus.FAILED
-                    step.error = str(e)
-                    workflow.add_log("error", f"Etapa '{step.name}' falhou: {e}")
-                    
-                    # Decide se continua ou aborta
-                    workflow.status = WorkflowStatus.FAILED
+                    for dependent in dependents[step.id]:
+                        remaining[dependent.id].discard(step.id)
+                        if not remaining[dependent.id] and workflow.status != WorkflowStatus.FAILED:
+                            launch(dependent)
+                
+                if workflow.status == WorkflowStatus.FAILED:
                     break
             
             # Finaliza workflow
             if workflow.status != WorkflowStatus.FAILED:
-                workflow.status = WorkflowStatus.COMPLETED
+                for step in steps:
+                    if remaining[step.id]:
+                        workflow.set_step_status(step, StepStatus.PENDING)
+                        workflow.add_log("warning", f"Etapa '{step.name}' aguardando dependências")
+                
+                self._set_status(workflow, WorkflowStatus.COMPLETED)
                 workflow.add_log("success", "Workflow concluído com sucesso")
             
-            workflow.completed_at = datetime.now()
+            workflow.set_completed(datetime.now())
             
         except Exception as e:
-            workflow.status = WorkflowStatus.FAILED
+            self._set_status(workflow, WorkflowStatus.FAILED)
             workflow.add_log("error", f"Erro na execução: {e}")
             logger.error(f"Erro executando workflow {workflow.id}: {e}")
         
         finally:
+            # Cancela etapas ainda em execução (falha ou cancelamento do workflow)
             self._running.pop(workflow.id, None)
+            for task in running:
+                task.cancel()
+            if running:
+                # Espera as etapas registrarem a interrupção
+                await asyncio.gather(*running, return_exceptions=True)
+    
+    async def _run_step(self, workflow: Workflow, step: WorkflowStep, openclaw_client=None) -> bool:
+        """Executa uma etapa; retorna False se ela falhar"""
+        workflow.set_step_status(step, StepStatus.RUNNING)
+        step.set_started(datetime.now())
+        workflow.add_log("info", f"Etapa '{step.name}' iniciada")
+        
+        try:
+            if openclaw_client and openclaw_client.connected:
+                # Cria subagente para executar a tarefa
+                result = await openclaw_client.create_subagent(
+                    task=step.task_template,
+                    label=f"{workflow.name} - {step.name}"
+                )
+                step.subagent_id = result.get("id")
+                step.invalidate()
+                
+                # Aguarda o gateway informar que o subagente terminou
+                done = await openclaw_client.wait_subagent(
+                    step.subagent_id,
+                    timeout=step.timeout_minutes * 60
+                )
+                if done is None:
+                    raise TimeoutError(f"subagente não concluiu em {step.timeout_minutes} min")
+            else:
+                # Modo simulado para testes
+                await asyncio.sleep(2)
+            
+            step.result = "Concluído com sucesso"
+            step.set_completed(datetime.now())
+            workflow.mark_step_completed(step)
+            workflow.add_log("success", f"Etapa '{step.name}' concluída")
+            return True
+            
+        except asyncio.CancelledError:
+            # Outra etapa falhou ou o workflow foi cancelado
+            step.set_completed(datetime.now())
+            workflow.set_step_status(step, StepStatus.SKIPPED)
+            workflow.add_log("warning", f"Etapa '{step.name}' interrompida")
+            raise
+        
+        except Exception as e:
+            step.error = str(e)
+            workflow.set_step_status(step, StepStatus.FAILED)
+            workflow.add_log("error", f"Etapa '{step.name}' falhou: {e}")
+            return False
     
     async def cancel_workflow(self, workflow_id: str) -> bool:
         """Cancela um workflow em execução"""
@@ -382,35 +602,28 @@ class WorkflowManager:
             task.cancel()
             self._running.pop(workflow_id, None)
         
-        workflow.status = WorkflowStatus.CANCELLED
-        workflow.completed_at = datetime.now()
+        self._set_status(workflow, WorkflowStatus.CANCELLED)
+        workflow.set_completed(datetime.now())
         workflow.add_log("warning", "Workflow cancelado pelo usuário")
         
         return True
     
     def get_templates(self) -> List[dict]:
         """Retorna lista de templates disponíveis"""
-        return [
-            {
-                "id": key,
-                "name": data["name"],
-                "description": data["description"],
-                "steps_count": len(data["steps"])
-            }
-            for key, data in self.TEMPLATES.items()
-        ]
+        return self._TEMPLATES_SUMMARY
     
     def get_stats(self) -> dict:
         """Retorna estatísticas dos workflows"""
-        all_workflows = list(self.workflows.values())
+        # Contagens vêm direto do índice por status, sem percorrer os workflows
+        by_status = self._by_status
         
         return {
-            "total": len(all_workflows),
-            "pending": sum(1 for w in all_workflows if w.status == WorkflowStatus.PENDING),
-            "running": sum(1 for w in all_workflows if w.status == WorkflowStatus.RUNNING),
-            "completed": sum(1 for w in all_workflows if w.status == WorkflowStatus.COMPLETED),
-            "failed": sum(1 for w in all_workflows if w.status == WorkflowStatus.FAILED),
-            "cancelled": sum(1 for w in all_workflows if w.status == WorkflowStatus.CANCELLED)
+            "total": len(self.workflows),
+            "pending": len(by_status[WorkflowStatus.PENDING]),
+            "running": len(by_status[WorkflowStatus.RUNNING]),
+            "completed": len(by_status[WorkflowStatus.COMPLETED]),
+            "failed": len(by_status[WorkflowStatus.FAILED]),
+            "cancelled": len(by_status[WorkflowStatus.CANCELLED])
         }
 
 